@@ -0,0 +1,81 @@
+"""
+Benchmarks the validation and conversion of the test fixtures, using the
+installed Pydantic backend. Run it once with Pydantic v1 and once with v2
+installed to compare both backends:
+
+    $ python -m benchmarks.backends [children]
+
+The fixtures from `tests/main.py` are scaled up by repeating their children,
+to get a large nested payload.
+"""
+
+import sys
+import timeit
+from typing import Any, Callable, Dict
+
+from pydantic import VERSION as PYDANTIC_VERSION
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_pydantic_orm.main import PYDANTIC_V2
+from tests.main import (
+    Base,
+    PydanticParent,
+    orm_create_input_data,
+    orm_update_input_data,
+)
+
+
+def scale(data: Dict[str, Any], children: int) -> Dict[str, Any]:
+    """Repeats the children of the given fixture, without their ids."""
+    scaled_children = [
+        {
+            "name": child["name"],
+            "popsicles": [
+                {"flavor": popsicle["flavor"]}
+                for popsicle in child["popsicles"]
+            ],
+        }
+        for _ in range(children // len(data["children"]))
+        for child in data["children"]
+    ]
+    return {**data, "id": None, "children": scaled_children}
+
+
+def validate(data: Dict[str, Any]) -> PydanticParent:
+    if PYDANTIC_V2:
+        schema: PydanticParent = getattr(PydanticParent, "model_validate")(
+            data
+        )
+        return schema
+    return PydanticParent.parse_obj(data)
+
+
+def run(name: str, function: Callable[[], Any], number: int) -> None:
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+    print(f"{name:<24}{seconds * 1000:>10.3f} ms")
+
+
+def main(children: int) -> None:
+    engine = create_engine("sqlite://", echo=False)
+    Base.metadata.create_all(bind=engine)
+    DatabaseSession = sessionmaker(bind=engine, autoflush=False)
+
+    create_data = scale(orm_create_input_data, children)
+    update_data = scale(orm_update_input_data, children)
+    create_schema = validate(create_data)
+
+    def to_orm() -> None:
+        with DatabaseSession() as db:
+            validate(create_data).to_orm(db)
+            db.commit()
+
+    print(f"Pydantic {PYDANTIC_VERSION}, {children} children per parent")
+    run("validate (create)", lambda: validate(create_data), 20)
+    run("validate (update)", lambda: validate(update_data), 20)
+    run("orm_create", create_schema.orm_create, 20)
+    run("validate + to_orm", to_orm, 5)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -62,19 +62,19 @@ class Parent(ParentBase):
 # CREATE/UPDATE models
 ###############################################################################
 class CarCreate(CarBase):
-    id: Optional[int]  # None for create, id for update
+    id: Optional[int] = None  # None for create, id for update
 
 
 class PopsicleCreate(PopsicleBase):
-    id: Optional[int]
+    id: Optional[int] = None
 
 
 class ChildCreate(ChildBase):
-    id: Optional[int]
+    id: Optional[int] = None
     popsicles: List[PopsicleCreate]
 
 
 class ParentCreate(ParentBase):
-    id: Optional[int]
+    id: Optional[int] = None
     children: List[ChildCreate]
     car: CarCreate
@@ -26,7 +26,11 @@ setup(
     long_description=LONG_DESCRIPTION,
     packages=find_packages(),
     python_requires=">=3.8",
-    install_requires=["pydantic >= 1.8.1", "sqlalchemy >= 1.4.11"],
+    install_requires=[
+        # Pydantic 2.0-2.3 skip the inherited model_post_init checks
+        "pydantic >= 1.8.1, != 2.0.*, != 2.1.*, != 2.2.*, != 2.3.*",
+        "sqlalchemy >= 1.4.11",
+    ],
     extras_require={
         "dev": [
             "pytest >= 6.2.3",
@@ -35,7 +39,8 @@ setup(
             "black >= 20.8",
             "mypy >= 0.812",
             "pdoc3 >= 0.9.2",
-        ]
+        ],
+        "pydantic2": ["pydantic >= 2.4"],
     },
     keywords=[
         "python",
@@ -13,6 +13,13 @@ specific functions `.orm_create()` and `.orm_update()`, and one general
 function `.to_orm()` that combines the functionality of the first 2, calling
 one or the other, depending on if there is an id provided.
 """
-from .main import ORMBaseSchema
 
-__all__ = ["ORMBaseSchema"]
+from .events import ChangeEvent, ChangeRecorder
+from .main import ORMBaseSchema, VersionConflictError
+
+__all__ = [
+    "ChangeEvent",
+    "ChangeRecorder",
+    "ORMBaseSchema",
+    "VersionConflictError",
+]
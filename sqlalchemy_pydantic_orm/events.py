@@ -0,0 +1,253 @@
+"""
+Change events for cache invalidation and change data capture (CDC).
+
+A ChangeRecorder listens to a SQLAlchemy session, and records every row that
+gets created, updated or deleted there. That includes the rows written by
+`orm_create()`, `orm_update()` and `to_orm()`, also the ones that
+`orm_update()` updates directly without loading them. The events are buffered
+and only delivered to the sink after the transaction is committed, a rollback
+discards them. So consumers know exactly what was written, without querying
+the database again.
+
+Usage example:
+    with ChangeRecorder(db, sink=queue.put_nowait):
+        schema.to_orm(db)
+        db.commit()  # delivers the events to the queue
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.orm.decl_api import DeclarativeMeta
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+
+class ChangeEvent(NamedTuple):
+    """A single row that was written to the database.
+
+    Attributes:
+        model (Type[DeclarativeMeta]):
+            The SQLAlchemy model class of the row.
+        primary_key (Tuple[Any, ...]):
+            The primary key values of the row.
+        operation (str):
+            Either "create", "update" or "delete".
+        columns (FrozenSet[str]):
+            The attribute names of the written columns, empty for a delete.
+    """
+
+    model: Type[DeclarativeMeta]
+    primary_key: Tuple[Any, ...]
+    operation: str
+    columns: FrozenSet[str]
+
+
+ChangeSink = Callable[[ChangeEvent], Any]
+"""Anything that accepts a ChangeEvent.
+
+For example a callback, `list.append`, `queue.Queue.put` or, when committing
+from the event loop thread, `asyncio.Queue.put_nowait`.
+"""
+
+
+class ChangeRecorder:
+    """Records the changes of a session and delivers them after commit.
+
+    Only one recorder can be attached to a session at a time. It stays
+    attached until `close()` is called, or the with block is exited.
+
+    Exceptions raised by the sink are not caught, the commit itself has
+    already succeeded at that point.
+    """
+
+    _INFO_KEY = "sqlalchemy-pydantic-orm.change_recorder"
+
+    def __init__(self, db: Session, sink: ChangeSink):
+        """Attaches the recorder to the session.
+
+        Args:
+            db (Session):
+                The session to record the changes of.
+            sink (ChangeSink):
+                Called with every ChangeEvent, after commit.
+
+        Raises:
+            ValueError:
+                When another recorder is already attached to the session
+        """
+        if self._INFO_KEY in db.info:
+            raise ValueError(
+                "sqlalchemy-pydantic-orm: "
+                "A ChangeRecorder is already attached to this session"
+            )
+        self.db = db
+        self.sink = sink
+        self._buffer: List[Tuple[SessionTransaction, ChangeEvent]] = []
+        self._committed = False
+
+        db.info[self._INFO_KEY] = self
+        event.listen(db, "after_flush", self._after_flush)
+        event.listen(db, "persistent_to_deleted", self._persistent_to_deleted)
+        event.listen(db, "after_commit", self._after_commit)
+        event.listen(db, "after_transaction_end", self._after_transaction_end)
+
+    def __enter__(self) -> "ChangeRecorder":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @classmethod
+    def of(cls, db: Session) -> Optional["ChangeRecorder"]:
+        """The recorder attached to the given session, if any."""
+        recorder: Optional[ChangeRecorder] = db.info.get(cls._INFO_KEY)
+        return recorder
+
+    def close(self) -> None:
+        """Detaches the recorder, pending events are discarded."""
+        event.remove(self.db, "after_flush", self._after_flush)
+        event.remove(
+            self.db, "persistent_to_deleted", self._persistent_to_deleted
+        )
+        event.remove(self.db, "after_commit", self._after_commit)
+        event.remove(
+            self.db, "after_transaction_end", self._after_transaction_end
+        )
+        self.db.info.pop(self._INFO_KEY, None)
+        self._buffer = []
+
+    def record(self, change: ChangeEvent) -> None:
+        """Records a change written outside of the ORM's flush.
+
+        The change belongs to the current (nested) transaction, and is
+        delivered or discarded together with it.
+        """
+        transaction = (
+            self.db.get_nested_transaction() or self.db.get_transaction()
+        )
+        self._buffer.append((transaction, change))
+
+    def _after_flush(self, db: Session, flush_context: Any) -> None:
+        """Records the new and updated rows, while their history is available.
+
+        Rows that are only dirty because of a changed relationship collection
+        have no changed columns, and are skipped. An updated row with a
+        `version_id_col` also reports that column, SQLAlchemy increments it
+        without recording any history.
+        """
+        for instance in db.new:
+            state = inspect(instance)
+            self.record(
+                _change_event(
+                    instance,
+                    CREATE,
+                    (
+                        column_attr.key
+                        for column_attr in state.mapper.column_attrs
+                        if state.dict.get(column_attr.key) is not None
+                    ),
+                )
+            )
+        for instance in db.dirty:
+            state = inspect(instance)
+            columns = [
+                column_attr.key
+                for column_attr in state.mapper.column_attrs
+                if state.attrs[column_attr.key].history.has_changes()
+            ]
+            version_id_col = state.mapper.version_id_col
+            if columns and version_id_col is not None:
+                columns.append(
+                    state.mapper.get_property_by_column(version_id_col).key
+                )
+            if columns:
+                self.record(_change_event(instance, UPDATE, columns))
+
+    def _persistent_to_deleted(self, db: Session, instance: Any) -> None:
+        """Records a row deleted by the flush.
+
+        Unlike `db.deleted`, this also includes the rows that are only deleted
+        by a cascade during the flush, like a removed delete-orphan item.
+        """
+        self.record(_change_event(instance, DELETE, ()))
+
+    def _after_commit(self, db: Session) -> None:
+        self._committed = True
+
+    def _after_transaction_end(
+        self, db: Session, transaction: SessionTransaction
+    ) -> None:
+        """Delivers the events of a committed root transaction.
+
+        The events of a rolled back (nested) transaction are discarded.
+        """
+        committed, self._committed = self._committed, False
+        if not committed:
+            self._buffer = [
+                (recorded_in, change)
+                for recorded_in, change in self._buffer
+                if not _is_within(recorded_in, transaction)
+            ]
+        elif transaction.parent is None:
+            buffer, self._buffer = self._buffer, []
+            for change in _coalesce(change for _, change in buffer):
+                self.sink(change)
+
+
+def _change_event(
+    instance: DeclarativeMeta, operation: str, columns: Iterable[str]
+) -> ChangeEvent:
+    mapper = inspect(type(instance))
+    return ChangeEvent(
+        mapper.class_,
+        tuple(mapper.primary_key_from_instance(instance)),
+        operation,
+        frozenset(columns),
+    )
+
+
+def _is_within(
+    transaction: Optional[SessionTransaction], ancestor: SessionTransaction
+) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _coalesce(changes: Iterable[ChangeEvent]) -> List[ChangeEvent]:
+    """Combines the changes of each row into one event, in order of arrival.
+
+    A row can be flushed more than once per transaction. Then the written
+    columns are combined, a create stays a create, and a row that is both
+    created and deleted is left out.
+    """
+    rows: Dict[Tuple[Any, ...], Optional[ChangeEvent]] = {}
+    for change in changes:
+        key = (change.model, change.primary_key)
+        previous = rows.get(key)
+        if previous is None:
+            rows[key] = change
+        elif change.operation == DELETE:
+            rows[key] = None if previous.operation == CREATE else change
+        else:
+            operation = CREATE if previous.operation == CREATE else UPDATE
+            columns = previous.columns | change.columns
+            rows[key] = change._replace(operation=operation, columns=columns)
+    return [change for change in rows.values() if change is not None]
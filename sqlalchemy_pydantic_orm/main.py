@@ -1,8 +1,12 @@
 """
-This is the main and also the only module of the sqlalchemy-pydantic-orm
-package. It consists of one class called ORMBaseSchema, which contains all the
-functionality. In the future there will also be a methods that generates
-schemas from SQLAlchemy models.
+This is the main module of the sqlalchemy-pydantic-orm package. It consists
+of one class called ORMBaseSchema, which contains all the conversion
+functionality. The events module reports the rows it writes. In the future
+there will also be a methods that generates schemas from SQLAlchemy models.
+
+Both Pydantic v1 and v2 (2.4+) are supported. The installed version is
+detected on import, `PYDANTIC_V2` tells which backend is used. With v2,
+validation runs in the compiled pydantic-core engine.
 
 
 The ORMBaseSchema is an extension of the Pydantic's BaseModel. It can use the
@@ -14,87 +18,321 @@ References:
     - https://fastapi.tiangolo.com/tutorial/sql-databases/
 """
 
+import collections.abc
 from abc import abstractmethod
 from collections import deque
-from typing import Any, Type
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
 
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from pydantic import VERSION as PYDANTIC_VERSION
+from pydantic import BaseModel, PrivateAttr
+from sqlalchemy import Column, bindparam, inspect, update
+from sqlalchemy.orm import ONETOMANY, Session, with_parent
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.decl_api import DeclarativeMeta
+from sqlalchemy.orm.exc import StaleDataError
+
+from .events import UPDATE, ChangeEvent, ChangeRecorder
 
 SUPPORTED_ITERABLES = (list, tuple, set, deque)  # Could be extended
+# Lazily fed as well
+ONE_TO_MANY_TYPES = (*SUPPORTED_ITERABLES, collections.abc.Iterator)
+
+PYDANTIC_V2 = PYDANTIC_VERSION.startswith("2.")
+
+
+class VersionConflictError(StaleDataError):  # type: ignore[misc]
+    """Raised when a provided version no longer matches the database row.
+
+    It inherits SQLAlchemy's StaleDataError, which is what SQLAlchemy itself
+    raises when a `version_id_col` check fails during a flush. Catching
+    StaleDataError therefore handles both kinds of conflicts.
+
+    Attributes:
+        db_model (DeclarativeMeta):
+            The ORM model that was going to be updated.
+        expected (Any):
+            The version provided in the schema.
+    """
+
+    def __init__(self, db_model: DeclarativeMeta, expected: Any):
+        self.db_model = db_model
+        self.expected = expected
+        super().__init__(
+            f"Provided version '{expected}' "
+            f"for table '{db_model.__tablename__}' "
+            f"with id '{inspect(db_model).identity}' "
+            "is outdated (sqlalchemy-pydantic-orm)"
+        )
+
+
+def _foreign_keys(
+    db_model: DeclarativeMeta, field_name: str
+) -> Optional[Dict[Column, Any]]:
+    """Foreign key values that link items of a relationship to db_model.
+
+    Only available for a plain one-to-many relationship that isn't loaded yet,
+    and when db_model already has its keys. Otherwise None is returned.
+    """
+    mapper = inspect(type(db_model))
+    relationship = mapper.relationships[field_name]
+    if (
+        field_name not in inspect(db_model).unloaded
+        or relationship.direction is not ONETOMANY
+        or relationship.secondary is not None
+    ):
+        return None
+    foreign_keys = {
+        remote: getattr(db_model, mapper.get_property_by_column(local).key)
+        for local, remote in relationship.local_remote_pairs
+    }
+    if None in foreign_keys.values():
+        return None
+    return foreign_keys
+
+
+Streams = List[Tuple[DeclarativeMeta, str, Iterator["ORMBaseSchema"]]]
+"""Lazily fed one-to-many fields, with the model they belong to."""
 
 
 class ORMBaseSchema(BaseModel):
-    class Config:
-        """Pydantic's default config class except with orm_mode set to True."""
+    if PYDANTIC_V2:
+        model_config = {"from_attributes": True}  # A v2 ConfigDict
+    else:
+
+        class Config:
+            """Pydantic's default config class with orm_mode set to True."""
+
+            orm_mode = True
+
+    _orm_version: Optional[str] = PrivateAttr(None)
+    """Name of the ORM attribute that is used as version counter.
+
+    Only needed when the SQLAlchemy model doesn't define a `version_id_col`
+    itself. The attribute has to be an integer column, and the schema needs a
+    field with the same name (or alias) to provide the expected version.
+    """
+
+    _orm_delete: Optional[str] = PrivateAttr(None)
+    """Name of the boolean schema field that marks an item for deletion.
+
+    A one-to-many item with an id and this field set to true gets deleted by
+    `orm_update()`, also when merging. The field is never copied to the model.
+    """
+
+    if PYDANTIC_V2:
+
+        @classmethod
+        def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+            """Turns the `_orm_*` private attributes into class attributes.
+
+            They configure the schema class, not a single instance, while
+            Pydantic v2 would copy every private attribute into each new
+            instance. For large nested payloads that costs more than the
+            validation in pydantic-core itself.
+            """
+            getattr(super(), "__pydantic_init_subclass__")(**kwargs)
+            for name in ("_orm_model", "_orm_version", "_orm_delete"):
+                if private_attribute := cls.__private_attributes__.pop(
+                    name, None
+                ):
+                    type.__setattr__(
+                        cls, name, private_attribute.get_default()
+                    )
+
+        def model_post_init(self, __context: Any) -> None:
+            """The Pydantic v2 counterpart of the validation in `__init__`.
+
+            Pydantic v2 doesn't call `__init__` when validating nested fields
+            or with `model_validate()`, so the checks run after validation.
+
+            Raises:
+                ValueError:
+                    When from_attributes is set to false /
+                    When the provided _orm_model is invalid
+            """
+            if not self.model_config.get("from_attributes"):
+                raise ValueError(
+                    "sqlalchemy-pydantic-orm: "
+                    "When adding your own 'model_config', "
+                    "make sure you set 'from_attributes' to 'true'"
+                )
+            self._orm_check_model()
+
+    else:
+
+        def __init__(self, **data: Any):
+            """The init is used for validation and throwing errors.
+
+            Pydantic catches all ValueError's in initialization, and then
+            outputs the error message in a easy to read format with the
+            specific class name displayed.
+            Every error is given the "sqlalchemy-pydantic-orm" identifier to
+            distinguish between Pydantic's or SQLAlchemy's own errors
+            and those of this package.
+
+            For performance its better to execute the `super().__init__()` as
+            late as possible, only the _orm_model check requires it to work
+            properly.
+
+            Args:
+                **data (Any):
+                    The fields and values to be validated.
+
+            Raises:
+                ValueError:
+                    When orm_mode is set to false /
+                    When the provided _orm_model is invalid
+            """
+            if not hasattr(config := self.Config, "orm_mode"):
+                # Overwriting when not defined
+                config.orm_mode = True
+            elif not config.orm_mode:
+                # Throws an error instead of overwriting to avoid confusion
+                raise ValueError(
+                    "sqlalchemy-pydantic-orm: "
+                    "When adding your own 'Config' class, "
+                    "make sure you set 'orm_mode' to 'true'"
+                )
 
-        orm_mode = True
+            super().__init__(**data)
 
-    def __init__(self, **data: Any):
-        """The init is used for validation and throwing errors where needed.
+            self._orm_check_model()
 
-        Pydantic catches all ValueError's in initialization, and then outputs
-        the error message in a easy to read format with the specific class
-        name displayed.
-        Every error is given the "sqlalchemy-pydantic-orm" identifier to
-        distinguish between Pydantic's or SQLAlchemy's own errors
-        and those of this package.
+        @property
+        @abstractmethod
+        def _orm_model(self) -> Type[DeclarativeMeta]:
+            """The corresponding SQLAlchemy model class
 
-        For performance its better to execute the `super().__init__()` as late
-        as possible, only the _orm_model check requires it to work properly.
+            The property decorator is used together with the @abstractmethod
+            decorator to enforce assignment. Pydantic v2 looks up private
+            attributes after regular ones, so there the property would shadow
+            the PrivateAttr and is left out.
 
-        Args:
-            **data (Any):
-                The fields and values to be validated.
+            This variable/property has a leading underscore and can only be
+            assigned as PrivateAttr (Pydantic). This is because a Pydantic
+            schema iterates over it's own fields and would otherwise cause
+            problems when encountering this variable/property.
+
+            Returns:
+                A SQLAlchemy model (indirectly) inherited from DeclarativeMeta
+            """
+            pass
+
+    def _orm_check_model(self) -> None:
+        """Checks the _orm_model, which requires an initialized schema.
 
         Raises:
             ValueError:
-                When orm_mode is set to false /
                 When the provided _orm_model is invalid
         """
-        if not hasattr(config := self.Config, "orm_mode"):
-            # Overwriting when not defined
-            config.orm_mode = True
-        elif not config.orm_mode:
-            # Throws an error instead of overwriting to avoid confusion
-            raise ValueError(
-                "sqlalchemy-pydantic-orm: "
-                "When adding your own 'Config' class, "
-                "make sure you set 'orm_mode' to 'true'"
-            )
-
-        super().__init__(**data)
-
-        if type(self._orm_model) != DeclarativeMeta:
+        if type(getattr(self, "_orm_model", None)) != DeclarativeMeta:
             raise ValueError(
                 "sqlalchemy-pydantic-orm: "
                 "Provided orm_model is not a valid SQLAlchemy model, "
                 "make sure it inherits the declarative base"
             )
-        elif "_orm_model" not in self.__private_attributes__:
+        elif (
+            not PYDANTIC_V2 and "_orm_model" not in self.__private_attributes__
+        ):
+            # Pydantic v2 treats every underscored attribute as PrivateAttr
             raise ValueError(
                 "sqlalchemy-pydantic-orm: "
                 "Provided orm_model is not wrapped in a pydantic PrivateAttr"
             )
 
-    @property
-    @abstractmethod
-    def _orm_model(self) -> Type[DeclarativeMeta]:
-        """The corresponding SQLAlchemy model class
+    def _orm_fields(self) -> Iterator[Tuple[str, str]]:
+        """Yields the name and alias of every field set in this schema.
 
-        The property decorator is used together with the @abstractmethod
-        decorator to enforce assignment.
+        Pydantic v2 has no alias when none is defined, then the name is used.
+        The v2 attributes are looked up with getattr, so both backends pass
+        the type checks.
+        """
+        if PYDANTIC_V2:
+            fields = getattr(type(self), "model_fields")
+            fields_set = getattr(self, "model_fields_set")
+        else:
+            fields, fields_set = self.__fields__, self.__fields_set__
+        for field in fields_set:
+            yield field, fields[field].alias or field
 
-        This variable/property has a leading underscore and can only be
-        assigned as PrivateAttr (Pydantic). This is because a Pydantic schema
-        iterates over it's own fields and would otherwise cause problems when
-        encountering this variable/property.
+    def _orm_version_key(self) -> Optional[str]:
+        """Name of the ORM attribute used for optimistic concurrency, if any.
 
-        Returns:
-            A SQLAlchemy model (indirectly) inherited from DeclarativeMeta
+        The `version_id_col` of the SQLAlchemy model has priority over the
+        `_orm_version` of the schema.
         """
-        pass
+        mapper = inspect(self._orm_model)
+        if mapper.version_id_col is not None:
+            key: str = mapper.get_property_by_column(mapper.version_id_col).key
+            return key
+        return self._orm_version
+
+    def _orm_check_version(
+        self, db: Session, db_model: DeclarativeMeta, version_key: str
+    ) -> None:
+        """Verifies the provided version and claims the row for this update.
+
+        When the model has a `version_id_col`, the version is increased on
+        the model, which forces SQLAlchemy to emit
+        `UPDATE ... WHERE pk = :id AND version = :v` during the flush, also
+        when only nested rows change. Otherwise that conditional update is
+        emitted here, and the row count tells if another writer came first.
+        Without a version generator the version is left as it is, the
+        application increases it.
+
+        Raises:
+            VersionConflictError:
+                When the provided version doesn't match the database row.
+        """
+        expected = next(
+            (
+                getattr(self, field)
+                for field, field_name in self._orm_fields()
+                if field_name == version_key
+            ),
+            None,
+        )
+        if expected is None:  # Nothing to check against
+            return
+        if getattr(db_model, version_key) != expected:
+            raise VersionConflictError(db_model, expected)
+
+        mapper = inspect(self._orm_model)
+        if mapper.version_id_col is None:
+            new_version = expected + 1
+        elif mapper.version_id_generator:
+            new_version = mapper.version_id_generator(expected)
+            setattr(db_model, version_key, new_version)
+            return
+        else:  # Versions are set by the application
+            new_version = expected
+
+        version = getattr(self._orm_model, version_key)
+        primary_key = [
+            getattr(self._orm_model, mapper.get_property_by_column(column).key)
+            == value
+            for column, value in zip(
+                mapper.primary_key, inspect(db_model).identity
+            )
+        ]
+        statement = (
+            update(self._orm_model)
+            .where(*primary_key, version == expected)
+            .values({version_key: new_version})
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(statement).rowcount != 1:
+            raise VersionConflictError(db_model, expected)
+        set_committed_value(db_model, version_key, new_version)
+        if new_version != expected and (recorder := ChangeRecorder.of(db)):
+            recorder.record(
+                ChangeEvent(
+                    self._orm_model,
+                    inspect(db_model).identity,
+                    UPDATE,
+                    frozenset([version_key]),
+                )
+            )
 
     def orm_create(self, **extra_fields: Any) -> DeclarativeMeta:
         """Method to convert a (nested) pydantic schema to a SQLAlchemy model.
@@ -121,31 +359,128 @@ class ORMBaseSchema(BaseModel):
             TypeError:
                 When a list is not fully consisted of other ORM schemas.
         """
+        return self._orm_create(extra_fields, None)
+
+    def _orm_create(
+        self, extra_fields: Dict[str, Any], streams: Optional[Streams]
+    ) -> DeclarativeMeta:
+        """The recursive implementation of `orm_create()`.
+
+        When streams is given, lazily fed one-to-many fields (iterators) are
+        not converted, but added to streams for `_orm_insert_streams()`.
+        Otherwise they are converted like any other list.
+        """
         current_level_fields = {}
-        for field in self.__fields_set__:
-            field_name = self.__fields__[field].alias
+        stream_fields = []
+        for field, field_name in self._orm_fields():
+            if field == self._orm_delete:
+                continue
             value = getattr(self, field)
             if isinstance(value, ORMBaseSchema):  # One-to-one
-                current_level_fields[field_name] = value.orm_create()
-
-            elif isinstance(value, SUPPORTED_ITERABLES):  # One-to-many
-                models = []
-                for schema in value:
-                    if not isinstance(schema, ORMBaseSchema):
-                        raise TypeError(
-                            "Lists should only contain other schemas "
-                            f"inherited from '{ORMBaseSchema.__name__}' "
-                            "(sqlalchemy-pydantic-orm)"
-                        )
-                    models.append(schema.orm_create())
-                current_level_fields[field_name] = models
+                current_level_fields[field_name] = value._orm_create(
+                    {}, streams
+                )
+
+            elif isinstance(value, ONE_TO_MANY_TYPES):  # One-to-many
+                schemas = self._orm_items(field, value)
+                if streams is not None and isinstance(
+                    value, collections.abc.Iterator
+                ):
+                    stream_fields.append((field_name, schemas))
+                else:
+                    current_level_fields[field_name] = [
+                        schema._orm_create({}, streams) for schema in schemas
+                    ]
 
             else:  # value without relation
                 current_level_fields[field_name] = value
 
-        return self._orm_model(**extra_fields, **current_level_fields)
+        db_model = self._orm_model(**extra_fields, **current_level_fields)
+        if streams is not None:
+            streams.extend(
+                (db_model, field_name, schemas)
+                for field_name, schemas in stream_fields
+            )
+        return db_model
+
+    def _orm_items(
+        self, field: str, items: Iterable[Any]
+    ) -> Iterator["ORMBaseSchema"]:
+        """Yields the items of a one-to-many field, validated one by one.
+
+        Pydantic v2 already validates lazily fed items (`Iterable` fields)
+        while they are iterated, Pydantic v1 passes them on as they are.
 
-    def orm_update(self, db: Session, db_model: DeclarativeMeta) -> None:
+        Raises:
+            TypeError:
+                When an item is not (convertible to) another ORM schema.
+        """
+        item_schema = (
+            None if PYDANTIC_V2 else getattr(self.__fields__[field], "type_")
+        )
+        for item in items:
+            if not isinstance(item, ORMBaseSchema) and (
+                isinstance(item_schema, type)
+                and issubclass(item_schema, ORMBaseSchema)
+            ):
+                item = item_schema.parse_obj(item)
+            if not isinstance(item, ORMBaseSchema):
+                raise TypeError(
+                    "Lists should only contain other schemas "
+                    f"inherited from '{ORMBaseSchema.__name__}' "
+                    "(sqlalchemy-pydantic-orm)"
+                )
+            yield item
+
+    @staticmethod
+    def _orm_insert_streams(
+        db: Session, streams: Streams, chunk_size: int
+    ) -> None:
+        """Inserts lazily fed one-to-many items in chunks.
+
+        Every chunk is validated, converted, linked to its parent through the
+        foreign keys, and flushed. Then the nested streams of the chunk are
+        inserted the same way, and the chunk is expunged from the session to
+        release it. So the memory use depends on chunk_size instead of the
+        number of items. The items of sibling streams share their chunks, so
+        many small nested streams don't each cost a flush.
+
+        The models owning the streams must already be flushed.
+        """
+        chunk_streams: Streams = []
+        new_items: List[DeclarativeMeta] = []
+        released_items: List[DeclarativeMeta] = []
+
+        def insert_chunk() -> None:
+            db.flush()
+            ORMBaseSchema._orm_insert_streams(db, chunk_streams, chunk_size)
+            for new_item in released_items:
+                db.expunge(new_item)
+            for items in (chunk_streams, new_items, released_items):
+                items.clear()
+
+        for db_model, field_name, schemas in streams:
+            # Items kept in a loaded collection can't be released
+            releasable = _foreign_keys(db_model, field_name) is not None
+            for schema in schemas:
+                new_item = schema._orm_create({}, chunk_streams)
+                ORMBaseSchema._orm_add_item(db, db_model, field_name, new_item)
+                new_items.append(new_item)
+                if releasable:
+                    released_items.append(new_item)
+                if len(new_items) >= chunk_size:
+                    insert_chunk()
+        if new_items:
+            insert_chunk()
+
+    def orm_update(
+        self,
+        db: Session,
+        db_model: DeclarativeMeta,
+        *,
+        merge: bool = False,
+        direct_update: bool = False,
+    ) -> None:
         """Method to update a (nested) orm structure.
 
         This method recursively updates an orm model with it's relationships.
@@ -156,11 +491,32 @@ class ORMBaseSchema(BaseModel):
         keep track of the parsed database items, and afterwards deletes any
         unparsed item.
 
+        With merge (PATCH semantics) unparsed items are left alone, and only
+        items marked with the `_orm_delete` field get deleted. A one-to-many
+        field set to None is then treated as not provided. A collection
+        that isn't loaded yet stays unloaded, the provided items are queried
+        and added one by one instead.
+
+        With direct_update, items of such an unloaded collection that only
+        provide an id and column values aren't even queried. They are updated
+        with one `UPDATE ... WHERE id = :id AND fk = :parent` per group of
+        columns (executemany), and the row count verifies their existence.
+
+        When the schema provides a version (see `_orm_version` or SQLAlchemy's
+        `version_id_col`), it is checked against the db_model before anything
+        gets updated. The version field itself is never copied to the model.
+
         Args:
             db (Session):
                 Database session used for `.add()` and `.delete()`.
             db_model (DeclarativeMeta):
                 The ORM model to be updated.
+            merge (bool):
+                Leave one-to-many items that aren't provided untouched.
+            direct_update (bool):
+                Update unloaded one-to-many items without loading them.
+                Only has effect together with merge, otherwise the whole
+                collection is loaded first to find the unparsed items.
 
         Returns:
             Nothing, everything gets done in the provided db_model
@@ -170,7 +526,10 @@ class ORMBaseSchema(BaseModel):
                 When a list is not fully consisted of other ORM schemas.
             ValueError:
                 When the provided db_model is not valid /
-                When a given id is not found in the database
+                When a given id is not found in the database /
+                When a one-to-many field is set to None without merge
+            VersionConflictError:
+                When a provided version is outdated
         """
         if not isinstance(db_model, self._orm_model):
             raise ValueError(
@@ -178,52 +537,261 @@ class ORMBaseSchema(BaseModel):
                 f"defined _orm_model '{self._orm_model.__name__}' "
                 "(sqlalchemy-pydantic-orm)"
             )
-        for field in self.__fields_set__:
-            field_name = self.__fields__[field].alias
-            db_value = getattr(db_model, field_name)
+        if version_key := self._orm_version_key():
+            self._orm_check_version(db, db_model, version_key)
+
+        relationships = inspect(self._orm_model).relationships
+        for field, field_name in self._orm_fields():
+            if field_name == version_key or field == self._orm_delete:
+                continue
             update_value = getattr(self, field)
+            if update_value is None and (
+                field_name in relationships
+                and relationships[field_name].uselist
+            ):  # One-to-many set to null
+                if merge:
+                    continue  # Same as not provided
+                raise ValueError(
+                    f"One-to-many field '{field_name}' can't be set to None, "
+                    "provide an empty list instead (sqlalchemy-pydantic-orm)"
+                )
+
             if isinstance(update_value, ORMBaseSchema):  # One-to-one
-                if db_value:
-                    update_value.orm_update(db, db_value)
+                if db_value := getattr(db_model, field_name):
+                    update_value.orm_update(
+                        db, db_value, merge=merge, direct_update=direct_update
+                    )
                 else:
                     setattr(db_model, field_name, update_value.orm_create())
 
-            elif isinstance(update_value, SUPPORTED_ITERABLES):  # One-to-many
+            elif isinstance(update_value, ONE_TO_MANY_TYPES):  # One-to-many
                 parsed_items = set()
-                for schema in update_value:
-                    if not isinstance(schema, ORMBaseSchema):
-                        raise TypeError(
-                            "Lists should only contain other schemas "
-                            f"inherited from '{ORMBaseSchema.__name__}' "
-                            "(sqlalchemy-pydantic-orm)"
-                        )
+                db_items = [] if merge else list(getattr(db_model, field_name))
+                foreign_keys = (
+                    _foreign_keys(db_model, field_name)
+                    if direct_update
+                    else None
+                )
+                direct_rows = []
+                for schema in self._orm_items(field, update_value):
                     if item_id := getattr(schema, "id", None):
-                        try:
-                            db_item = next(
-                                item for item in db_value if item.id == item_id
+                        if (
+                            foreign_keys is not None
+                            and (values := schema._orm_direct_values())
+                            and db.identity_key(schema._orm_model, item_id)
+                            not in db.identity_map
+                        ):
+                            direct_rows.append((item_id, values))
+                            continue
+
+                        db_item = self._orm_get_item(
+                            db, db_model, field_name, item_id
+                        )
+                        if schema._orm_marked_for_deletion():
+                            db.delete(db_item)
+                        else:
+                            schema.orm_update(
+                                db,
+                                db_item,
+                                merge=merge,
+                                direct_update=direct_update,
                             )
-                        except StopIteration:
-                            raise ValueError(
-                                f"Provided id '{item_id}' "
-                                f"for field '{field_name}' "
-                                "can't be found in the database "
-                                "(sqlalchemy-pydantic-orm)"
-                            ) from None  # removes unnecessary traceback
-
-                        schema.orm_update(db, db_item)
-                        parsed_items.add(db_item)
+                            parsed_items.add(db_item)
+                    elif schema._orm_marked_for_deletion():
+                        raise ValueError(
+                            f"Item in field '{field_name}' is marked for "
+                            "deletion without providing an id "
+                            "(sqlalchemy-pydantic-orm)"
+                        )
                     else:
                         new_item = schema.orm_create()
                         parsed_items.add(new_item)
-                        db_value.append(new_item)
-
-                for db_item in db_value:
+                        self._orm_add_item(db, db_model, field_name, new_item)
+
+                if direct_rows:
+                    assert foreign_keys is not None  # Only collected then
+                    self._orm_update_rows(
+                        db, db_model, field_name, foreign_keys, direct_rows
+                    )
+                for db_item in db_items:
                     if db_item not in parsed_items:
                         db.delete(db_item)
             else:
                 setattr(db_model, field_name, update_value)
 
-    def to_orm(self, db: Session, **extra_fields: Any) -> DeclarativeMeta:
+    def _orm_marked_for_deletion(self) -> bool:
+        """Whether the `_orm_delete` field of this item is set to true."""
+        return self._orm_delete is not None and bool(
+            getattr(self, self._orm_delete)
+        )
+
+    def _orm_direct_values(self) -> Optional[Dict[str, Any]]:
+        """Column values of this item when it can be updated directly.
+
+        Returns None when the item provides anything that needs the loaded
+        model, like nested fields, a version or a deletion marker.
+        """
+        if self._orm_version_key() or self._orm_marked_for_deletion():
+            return None
+        mapper = inspect(self._orm_model)
+        column_keys = {
+            column_attr.key
+            for column_attr in mapper.column_attrs
+            if column_attr.columns[0].table is mapper.local_table
+        }
+        values = {}
+        for field, field_name in self._orm_fields():
+            if field == self._orm_delete or field_name == "id":
+                continue
+            if field_name not in column_keys:
+                return None
+            values[field_name] = getattr(self, field)
+        return values or None
+
+    @staticmethod
+    def _orm_update_rows(
+        db: Session,
+        db_model: DeclarativeMeta,
+        field_name: str,
+        foreign_keys: Dict[Column, Any],
+        rows: List[Tuple[Any, Dict[str, Any]]],
+    ) -> None:
+        """Updates one-to-many items by their id, without loading them.
+
+        Rows that update the same columns are grouped into one executemany
+        statement, which also filters on the foreign keys to db_model.
+
+        Raises:
+            ValueError:
+                When one of the ids can't be found in the relationship
+        """
+        item_mapper = inspect(type(db_model)).relationships[field_name].mapper
+        id_column = item_mapper.get_property("id").columns[0]
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for item_id, values in rows:
+            params = {f"value_{key}": value for key, value in values.items()}
+            params["item_id"] = item_id
+            groups.setdefault(tuple(sorted(values)), []).append(params)
+
+        dialect = db.get_bind(item_mapper).dialect
+        for keys, params_list in groups.items():
+            statement = (
+                update(id_column.table)
+                .where(
+                    id_column == bindparam("item_id"),
+                    *(
+                        column == value
+                        for column, value in foreign_keys.items()
+                    ),
+                )
+                .values(
+                    {
+                        item_mapper.get_property(key).columns[0]: bindparam(
+                            f"value_{key}"
+                        )
+                        for key in keys
+                    }
+                )
+            )
+            if dialect.supports_sane_multi_rowcount:
+                rowcount = db.execute(statement, params_list).rowcount
+            else:
+                rowcount = sum(
+                    db.execute(statement, params).rowcount
+                    for params in params_list
+                )
+            if rowcount != len(params_list):
+                raise ValueError(
+                    "Not all provided ids "
+                    f"for field '{field_name}' "
+                    "can be found in the database "
+                    "(sqlalchemy-pydantic-orm)"
+                )
+            if recorder := ChangeRecorder.of(db):  # Bypassed the flush
+                for params in params_list:
+                    recorder.record(
+                        ChangeEvent(
+                            item_mapper.class_,
+                            (params["item_id"],),
+                            UPDATE,
+                            frozenset(keys),
+                        )
+                    )
+
+    @staticmethod
+    def _orm_get_item(
+        db: Session, db_model: DeclarativeMeta, field_name: str, item_id: Any
+    ) -> DeclarativeMeta:
+        """Gets an item from a one-to-many relationship by its id.
+
+        An already loaded collection is searched in memory. Otherwise only the
+        requested item is queried, filtered on the parent as well.
+
+        Raises:
+            ValueError:
+                When the id can't be found in the relationship
+        """
+        if field_name in inspect(db_model).unloaded:
+            relationship = getattr(type(db_model), field_name)
+            item_model = relationship.property.mapper.class_
+            db_item = (
+                db.query(item_model)
+                .filter(with_parent(db_model, relationship))
+                .filter(item_model.id == item_id)
+                .one_or_none()
+            )
+        else:
+            db_item = next(
+                (
+                    item
+                    for item in getattr(db_model, field_name)
+                    if item.id == item_id
+                ),
+                None,
+            )
+        if db_item is None:
+            raise ValueError(
+                f"Provided id '{item_id}' "
+                f"for field '{field_name}' "
+                "can't be found in the database "
+                "(sqlalchemy-pydantic-orm)"
+            )
+        return db_item
+
+    @staticmethod
+    def _orm_add_item(
+        db: Session,
+        db_model: DeclarativeMeta,
+        field_name: str,
+        new_item: DeclarativeMeta,
+    ) -> None:
+        """Adds a new item to a one-to-many relationship.
+
+        When the collection isn't loaded yet, the foreign key of a plain
+        one-to-many relationship is set directly, so the collection doesn't
+        have to be loaded just to append a single item.
+        """
+        foreign_keys = _foreign_keys(db_model, field_name)
+        if foreign_keys is None:
+            getattr(db_model, field_name).append(new_item)
+            return
+
+        item_mapper = inspect(type(new_item))
+        for column, value in foreign_keys.items():
+            setattr(
+                new_item, item_mapper.get_property_by_column(column).key, value
+            )
+        db.add(new_item)
+
+    def to_orm(
+        self,
+        db: Session,
+        *,
+        merge: bool = False,
+        direct_update: bool = False,
+        chunk_size: int = 1000,
+        **extra_fields: Any,
+    ) -> DeclarativeMeta:
         """Method that combines the functionality of orm_create & orm_update.
 
         This method is a wrapper around the other two methods. When no id is
@@ -234,8 +802,23 @@ class ORMBaseSchema(BaseModel):
         add the newly created model to the database. So after the this method
         has been executed you only need to call `db.commit()` after.
 
+        When creating, one-to-many fields can be fed lazily with an iterator
+        (typed as `Iterable[Schema]`). Those items are validated, converted
+        and inserted in chunks, so the new model gets flushed. When an item
+        turns out to be invalid, the already flushed chunks remain in the
+        transaction, so roll it back. Such a field can be consumed only once:
+        calling `orm_create()` or `orm_update()`, or iterating the field
+        yourself, exhausts it, and `to_orm()` then inserts no items.
+
         Args:
             db (Session):
+            merge (bool):
+                Passed to `orm_update()`, see its docstring.
+            direct_update (bool):
+                Passed to `orm_update()`, see its docstring. Only has effect
+                together with merge.
+            chunk_size (int):
+                The number of lazily fed items inserted at once.
             **extra_fields (Any):
 
         Returns:
@@ -245,6 +828,8 @@ class ORMBaseSchema(BaseModel):
         Raises:
             ValueError:
                 When the provided id is not found in the database
+            VersionConflictError:
+                When a provided version is outdated
         """
         id_ = getattr(self, "id", None)
         if not id_ and "id" in extra_fields:  # Pydantic field has priority
@@ -258,9 +843,15 @@ class ORMBaseSchema(BaseModel):
                     "can't be found in the database "
                     "(sqlalchemy-pydantic-orm)"
                 )
-            self.orm_update(db, db_model)
+            self.orm_update(
+                db, db_model, merge=merge, direct_update=direct_update
+            )
         else:
-            db_model = self.orm_create(**extra_fields)
+            streams: Streams = []
+            db_model = self._orm_create(extra_fields, streams)
             db.add(db_model)
+            if streams:
+                db.flush()
+                self._orm_insert_streams(db, streams, chunk_size)
 
         return db_model
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 from pydantic import Field, PrivateAttr
 from sqlalchemy import Column, ForeignKey, Integer, String
@@ -49,22 +49,50 @@ class Car(Base):  # type: ignore
     owner = relationship("Parent", back_populates="car")
 
 
+class Diary(Base):  # type: ignore
+    __tablename__ = "diaries"
+
+    id = Column(Integer, primary_key=True, index=True, nullable=False)
+    title = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+
+    pages = relationship("Page", cascade="all, delete-orphan")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+class Page(Base):  # type: ignore
+    __tablename__ = "pages"
+
+    id = Column(Integer, primary_key=True, index=True, nullable=False)
+    text = Column(String, nullable=False)
+    diary_id = Column(Integer, ForeignKey("diaries.id"), nullable=False)
+
+
+class Toy(Base):  # type: ignore
+    __tablename__ = "toys"
+
+    id = Column(Integer, primary_key=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    revision = Column(Integer, nullable=False, default=1)
+
+
 class PydanticCar(ORMBaseSchema):
-    id: Optional[int]
+    id: Optional[int] = None
     colour: str = Field(alias="color")  # mostly used for reserved names
 
     _orm_model = PrivateAttr(Car)
 
 
 class PydanticPopsicle(ORMBaseSchema):
-    id: Optional[int]
+    id: Optional[int] = None
     flavor: str
 
     _orm_model = PrivateAttr(Popsicle)
 
 
 class PydanticChild(ORMBaseSchema):
-    id: Optional[int]
+    id: Optional[int] = None
     name: str
     popsicles: List[PydanticPopsicle]
 
@@ -72,7 +100,7 @@ class PydanticChild(ORMBaseSchema):
 
 
 class PydanticParent(ORMBaseSchema):
-    id: Optional[int]
+    id: Optional[int] = None
     name: str
     children: List[PydanticChild]
     car: PydanticCar
@@ -80,6 +108,57 @@ class PydanticParent(ORMBaseSchema):
     _orm_model = PrivateAttr(Parent)
 
 
+class PydanticPopsiclePatch(PydanticPopsicle):
+    flavor: Optional[str] = None  # type: ignore
+    delete: bool = False
+
+    _orm_delete = PrivateAttr("delete")
+
+
+class PydanticChildPatch(PydanticChild):
+    name: Optional[str] = None  # type: ignore
+    popsicles: Optional[List[PydanticPopsiclePatch]] = None  # type: ignore
+
+
+class PydanticParentPatch(PydanticParent):
+    name: Optional[str] = None  # type: ignore
+    children: Optional[List[PydanticChildPatch]] = None  # type: ignore
+    car: Optional[PydanticCar] = None  # type: ignore
+
+
+class PydanticChildStream(PydanticChild):
+    popsicles: Iterable[PydanticPopsicle]  # type: ignore
+
+
+class PydanticParentStream(PydanticParent):
+    children: Iterable[PydanticChildStream]  # type: ignore
+
+
+class PydanticPage(ORMBaseSchema):
+    id: Optional[int] = None
+    text: str
+
+    _orm_model = PrivateAttr(Page)
+
+
+class PydanticDiary(ORMBaseSchema):
+    id: Optional[int] = None
+    title: Optional[str] = None
+    version: Optional[int] = None
+    pages: Optional[List[PydanticPage]] = None
+
+    _orm_model = PrivateAttr(Diary)
+
+
+class PydanticToy(ORMBaseSchema):
+    id: Optional[int] = None
+    name: str
+    revision: Optional[int] = None
+
+    _orm_model = PrivateAttr(Toy)
+    _orm_version = PrivateAttr("revision")
+
+
 orm_create_input_data = {
     "name": "Bob",
     "children": [
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Type, cast
+
+import pytest
+from pydantic import PrivateAttr
+
+from sqlalchemy_pydantic_orm import ORMBaseSchema
+from sqlalchemy_pydantic_orm.main import PYDANTIC_V2
+
+from .main import PydanticParent, orm_create_input_data
+
+
+class InvalidSchema(ORMBaseSchema):
+    name: str
+
+    _orm_model = PrivateAttr(cast(Any, 5))
+
+
+class InvalidParentSchema(PydanticParent):
+    invalid: InvalidSchema
+
+
+def validate(
+    schema: Type[ORMBaseSchema], data: Dict[str, Any]
+) -> ORMBaseSchema:
+    if PYDANTIC_V2:
+        validated: ORMBaseSchema = getattr(schema, "model_validate")(data)
+        return validated
+    return schema.parse_obj(data)
+
+
+def test_validate() -> None:
+    schema_in = validate(PydanticParent, orm_create_input_data)
+    db_model = schema_in.orm_create()
+    assert db_model.car.color == "Blue"
+    assert [child.name for child in db_model.children] == ["Tim", "Ana"]
+
+
+def test_invalid_orm_model() -> None:
+    with pytest.raises(ValueError):
+        InvalidSchema(name="Bob")
+    with pytest.raises(ValueError):  # also checked when nested
+        validate(
+            InvalidParentSchema,
+            {**orm_create_input_data, "invalid": {"name": "Bob"}},
+        )
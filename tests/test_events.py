@@ -0,0 +1,145 @@
+from typing import Any, Dict, List, Tuple, Type
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from sqlalchemy_pydantic_orm import ChangeEvent, ChangeRecorder
+
+from .main import (
+    Base,
+    Car,
+    Child,
+    Diary,
+    Page,
+    Parent,
+    Popsicle,
+    PydanticDiary,
+    PydanticParent,
+    PydanticParentPatch,
+    orm_create_input_data,
+    orm_update_input_data,
+)
+
+engine = create_engine("sqlite://", echo=False)
+Base.metadata.create_all(bind=engine)
+DatabaseSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db: Session = DatabaseSession()
+
+
+def test_create_events() -> None:
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        PydanticParent.parse_obj(orm_create_input_data).to_orm(db)
+        db.flush()
+        assert changes == []  # only after commit
+        db.commit()
+
+    assert len(changes) == 8
+    assert {change.operation for change in changes} == {"create"}
+    assert (
+        ChangeEvent(
+            Car, (1,), "create", frozenset(["id", "color", "owner_id"])
+        )
+        in changes
+    )
+
+
+def test_update_events() -> None:
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        PydanticParent.parse_obj(orm_update_input_data).to_orm(db)
+        db.commit()
+
+    def operations(model: Type[Base]) -> Dict[Tuple[Any, ...], str]:
+        return {
+            change.primary_key: change.operation
+            for change in changes
+            if change.model is model
+        }
+
+    assert operations(Parent) == {(1,): "update"}
+    assert operations(Car) == {(1,): "update"}
+    assert operations(Child) == {
+        (1,): "delete",
+        (2,): "update",
+        (3,): "create",
+    }
+    assert operations(Popsicle) == {
+        (1,): "delete",
+        (2,): "update",
+        (3,): "delete",
+        (5,): "create",
+        (6,): "create",
+    }
+    parent_change = next(
+        change for change in changes if change.model is Parent
+    )
+    assert parent_change.columns == frozenset(["name"])
+
+
+def test_direct_update_events() -> None:
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        PydanticParentPatch.parse_obj(
+            {"id": 1, "children": [{"id": 2, "name": "Anna"}]}
+        ).to_orm(db, merge=True, direct_update=True)
+        db.commit()
+    assert changes == [ChangeEvent(Child, (2,), "update", frozenset(["name"]))]
+
+
+def test_version_id_col_events() -> None:
+    db_model = PydanticDiary(title="Monday").to_orm(db)
+    db.commit()
+
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        PydanticDiary(id=db_model.id, title="Tuesday").to_orm(db)
+        db.commit()
+    assert changes == [
+        ChangeEvent(
+            Diary, (db_model.id,), "update", frozenset(["title", "version"])
+        )
+    ]
+
+
+def test_delete_orphan_events() -> None:
+    db_model = PydanticDiary.parse_obj(
+        {"title": "Monday", "pages": [{"text": "Sunny"}, {"text": "Rainy"}]}
+    ).to_orm(db)
+    db.commit()
+    removed_page = db_model.pages[1]
+
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        db_model.pages.remove(removed_page)  # only deleted by the cascade
+        db.commit()
+    assert changes == [
+        ChangeEvent(Page, (removed_page.id,), "delete", frozenset())
+    ]
+
+
+def test_rollback_discards_events() -> None:
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        PydanticParent.parse_obj(orm_create_input_data).to_orm(db)
+        db.flush()
+        db.rollback()
+
+        savepoint = db.begin_nested()
+        PydanticParentPatch(id=1, name="Kees").to_orm(db)
+        db.flush()
+        savepoint.rollback()
+        PydanticParentPatch(id=1, name="Piet").to_orm(db)
+        db.commit()
+    assert changes == [
+        ChangeEvent(Parent, (1,), "update", frozenset(["name"]))
+    ]
+
+
+def test_single_recorder() -> None:
+    changes: List[ChangeEvent] = []
+    with ChangeRecorder(db, changes.append):
+        with pytest.raises(ValueError):
+            ChangeRecorder(db, changes.append)
+    assert ChangeRecorder.of(db) is None
@@ -0,0 +1,151 @@
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from .main import (
+    Base,
+    Parent,
+    PydanticParent,
+    PydanticParentPatch,
+    orm_create_input_data,
+)
+
+engine = create_engine("sqlite://", echo=False)
+Base.metadata.create_all(bind=engine)
+DatabaseSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db: Session = DatabaseSession()
+
+orm_merge_input_data = {
+    "id": 1,
+    "children": [
+        {
+            "id": 2,
+            "popsicles": [
+                {"id": 3, "flavor": "Lemon"},
+                {"id": 4, "delete": True},
+                {"flavor": "Apple"},
+            ],
+        },
+    ],
+}
+
+orm_merge_output_data = {
+    "name": "Bob",
+    "id": 1,
+    "children": [
+        {
+            "name": "Tim",
+            "id": 1,
+            "popsicles": [{"flavor": "Strawberry", "id": 1}],
+        },
+        {
+            "name": "Ana",
+            "id": 2,
+            "popsicles": [
+                {"flavor": "Melon", "id": 2},
+                {"flavor": "Lemon", "id": 3},
+                {"flavor": "Apple", "id": 5},
+            ],
+        },
+    ],
+    "car": {"color": "Blue", "id": 1},
+}
+
+
+def test_to_orm_merge() -> None:
+    db_model = PydanticParent.parse_obj(orm_create_input_data).to_orm(db)
+    db.commit()
+    schema_in = PydanticParentPatch.parse_obj(orm_merge_input_data)
+    schema_in.to_orm(db, merge=True)
+    assert "children" in inspect(db_model).unloaded  # no full collection
+    db.commit()
+    db.refresh(db_model)
+    schema_out = PydanticParent.from_orm(db_model)
+    assert schema_out.dict(by_alias=True) == orm_merge_output_data
+
+
+def test_to_orm_merge_invalid() -> None:
+    schema_in = PydanticParentPatch.parse_obj(
+        {"id": 1, "children": [{"id": 1, "popsicles": [{"id": 2}]}]}
+    )
+    with pytest.raises(ValueError):  # popsicle of another child
+        schema_in.to_orm(db, merge=True)
+    db.rollback()
+
+    schema_in = PydanticParentPatch.parse_obj(
+        {"id": 1, "children": [{"id": 1, "popsicles": [{"delete": True}]}]}
+    )
+    with pytest.raises(ValueError):  # nothing to delete
+        schema_in.to_orm(db, merge=True)
+    db.rollback()
+
+
+def test_to_orm_merge_none() -> None:
+    schema_in = PydanticParentPatch.parse_obj({"id": 1, "children": None})
+    db_model = schema_in.to_orm(db, merge=True)  # not provided
+    assert [child.id for child in db_model.children] == [1, 2]
+    db.rollback()
+
+    with pytest.raises(ValueError):  # not an empty list
+        schema_in.to_orm(db)
+    db.rollback()
+
+
+def test_orm_update_delete_marker() -> None:
+    schema_in = PydanticParentPatch.parse_obj(
+        {
+            "id": 1,
+            "children": [
+                {"id": 2, "popsicles": [{"id": 3}, {"id": 5, "delete": True}]}
+            ],
+        }
+    )
+    db_model = db.query(Parent).get(1)
+    schema_in.orm_update(db, db_model)
+    db.commit()
+    db.refresh(db_model)
+    assert [child.id for child in db_model.children] == [2]
+    assert [item.id for item in db_model.children[0].popsicles] == [3]
+
+
+def test_to_orm_direct_update() -> None:
+    db_model = PydanticParent.parse_obj(orm_create_input_data).to_orm(db)
+    db.commit()
+    ids = [child.id for child in db_model.children]
+    db.expire_all()
+    statements = []
+
+    def log_statement(*args: Any) -> None:
+        statements.append(args[2])
+
+    schema_in = PydanticParentPatch.parse_obj(
+        {
+            "id": db_model.id,
+            "children": [
+                {"id": ids[0], "name": "Tom"},
+                {"id": ids[1], "name": "Anna"},
+            ],
+        }
+    )
+    event.listen(engine, "before_cursor_execute", log_statement)
+    try:
+        schema_in.to_orm(db, merge=True, direct_update=True)
+    finally:
+        event.remove(engine, "before_cursor_execute", log_statement)
+    db.commit()
+
+    assert not any("FROM children" in statement for statement in statements)
+    assert sum(statement.startswith("UPDATE") for statement in statements) == 1
+    names = [child.name for child in db_model.children]
+    assert names == ["Tom", "Anna"]
+
+
+def test_to_orm_direct_update_invalid() -> None:
+    schema_in = PydanticParentPatch.parse_obj(
+        {"id": 1, "children": [{"id": 9, "name": "Nobody"}]}
+    )
+    with pytest.raises(ValueError):
+        schema_in.to_orm(db, merge=True, direct_update=True)
+    db.rollback()
@@ -0,0 +1,58 @@
+from typing import Any, Dict, Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .main import (
+    Base,
+    Parent,
+    PydanticParent,
+    PydanticParentStream,
+    orm_create_input_data,
+    orm_create_output_data,
+)
+
+engine = create_engine("sqlite://", echo=False)
+Base.metadata.create_all(bind=engine)
+DatabaseSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db: Session = DatabaseSession()
+
+
+def lazily_fed(data: Dict[str, Any]) -> Dict[str, Any]:
+    def children() -> Iterator[Dict[str, Any]]:
+        for child in data["children"]:
+            yield {**child, "popsicles": iter(child["popsicles"])}
+
+    return {**data, "children": children()}
+
+
+def test_to_orm_streams() -> None:
+    schema_in = PydanticParentStream.parse_obj(
+        lazily_fed(orm_create_input_data)
+    )
+    db_model = schema_in.to_orm(db, chunk_size=1)
+    assert len(db.identity_map) == 2  # children are released, only car left
+    db.commit()
+    db.refresh(db_model)
+    schema_out = PydanticParent.from_orm(db_model)
+    assert schema_out.dict(by_alias=True) == orm_create_output_data
+
+
+def test_orm_create_streams() -> None:
+    schema_in = PydanticParentStream.parse_obj(
+        lazily_fed(orm_create_input_data)
+    )
+    db_model = schema_in.orm_create()
+    assert [len(child.popsicles) for child in db_model.children] == [1, 3]
+
+
+def test_to_orm_streams_invalid() -> None:
+    data = lazily_fed(
+        {**orm_create_input_data, "children": [{"popsicles": []}]}
+    )
+    schema_in = PydanticParentStream.parse_obj(data)
+    with pytest.raises(ValueError):  # only validated while inserting
+        schema_in.to_orm(db)
+    db.rollback()
+    assert db.query(Parent).count() == 1
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlalchemy_pydantic_orm import VersionConflictError
+
+from .main import Base, Diary, PydanticDiary, PydanticToy, Toy
+
+engine = create_engine("sqlite://", echo=False)
+Base.metadata.create_all(bind=engine)
+DatabaseSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db: Session = DatabaseSession()
+
+
+def test_version_id_col() -> None:
+    db_model = PydanticDiary(title="Monday").to_orm(db)
+    db.commit()
+    assert db_model.version == 1
+
+    PydanticDiary(id=db_model.id, title="Tuesday", version=1).to_orm(db)
+    db.commit()
+    assert (db_model.title, db_model.version) == ("Tuesday", 2)
+
+    with pytest.raises(VersionConflictError):
+        PydanticDiary(id=db_model.id, title="Friday", version=1).to_orm(db)
+    db.rollback()
+
+
+def test_version_id_col_concurrent_write() -> None:
+    db_model = PydanticDiary(title="Monday").to_orm(db)
+    db.commit()
+    schema_in = PydanticDiary(id=db_model.id, title="Tuesday", version=1)
+    schema_in.orm_update(db, db_model)
+    db.execute(  # another writer, after the model was loaded
+        update(Diary.__table__)
+        .where(Diary.id == db_model.id)
+        .values(version=2)
+    )
+    with pytest.raises(StaleDataError):
+        db.commit()
+    db.rollback()
+
+
+def test_version_id_col_nested_only() -> None:
+    db_model = PydanticDiary(title="Monday").to_orm(db)
+    db.commit()
+    db_model.version  # load before the other writer
+    db.execute(
+        update(Diary.__table__)
+        .where(Diary.id == db_model.id)
+        .values(version=5)
+    )
+    schema_in = PydanticDiary.parse_obj(
+        {"id": db_model.id, "version": 1, "pages": [{"text": "Dear diary"}]}
+    )
+    schema_in.to_orm(db, merge=True)
+    with pytest.raises(StaleDataError):
+        db.commit()
+    db.rollback()  # also undoes the other writer
+
+    schema_in.version = 1
+    schema_in.to_orm(db, merge=True)
+    db.commit()
+    assert (db_model.version, len(db_model.pages)) == (2, 1)
+
+
+def test_explicit_version() -> None:
+    db_model = PydanticToy(name="Ball").to_orm(db)
+    db.commit()
+    assert db_model.revision == 1
+
+    PydanticToy(id=db_model.id, name="Kite", revision=1).to_orm(db)
+    db.commit()
+    db.refresh(db_model)
+    assert (db_model.name, db_model.revision) == ("Kite", 2)
+
+    with pytest.raises(VersionConflictError) as error:
+        PydanticToy(id=db_model.id, name="Yoyo", revision=1).to_orm(db)
+    assert (error.value.db_model, error.value.expected) == (db_model, 1)
+    db.rollback()
+
+
+def test_explicit_version_concurrent_write() -> None:
+    db_model = PydanticToy(name="Ball").to_orm(db)
+    db.commit()
+    db_model.revision  # load before the other writer
+    db.execute(
+        update(Toy.__table__).where(Toy.id == db_model.id).values(revision=2)
+    )
+    schema_in = PydanticToy(id=db_model.id, name="Kite", revision=1)
+    with pytest.raises(VersionConflictError):
+        schema_in.orm_update(db, db_model)
+    db.rollback()
+
+
+def test_without_version() -> None:
+    db_model = PydanticToy(name="Ball").to_orm(db)
+    db.commit()
+    PydanticToy(id=db_model.id, name="Kite").to_orm(db)
+    db.commit()
+    assert (db_model.name, db_model.revision) == ("Kite", 1)